@@ -1,35 +1,28 @@
 import argparse
 import os
+import re
 import shutil
 
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
 
 UTT_PREFIX = "csd"
 DEV_LIST = ["046"]
 TEST_LIST = ["047", "048", "049", "050"]
+DEV_SET = frozenset(DEV_LIST)
+TEST_SET = frozenset(TEST_LIST)
+SONG_ID_RE = re.compile(r"\d+")
 
 
-def train_check(song):
-    return not test_check(song) and not dev_check(song)
-
-
-def dev_check(song):
-    for dev in DEV_LIST:
-        if dev in song:
-            return True
-    return False
-
-
-def test_check(song):
-    for test in TEST_LIST:
-        if test in song:
-            return True
-    return False
+def get_song_id(song):
+    # e.g. en046a -> 046
+    match = SONG_ID_RE.search(song)
+    return match.group() if match is not None else song
 
 
 def pack_zero(string, size=20):
-    if len(string) < size:
-        string = "0" * (size - len(string)) + string
-    return string
+    return string.zfill(size)
 
 
 def makedir(data_url):
@@ -40,53 +33,65 @@ def makedir(data_url):
 
 
 def process_text_info(text):
-    info = open(text, "r", encoding="utf-8")
     label_info = []
     text_info = []
-    for line in info.readlines():
-        line = line.strip().split()
-        if line[0] == "start":
-            continue
-        label_info.append(
-            "{} {} {}".format(float(line[0]), float(line[1]), line[3].strip())
-        )
-        text_info.append(line[3].strip())
+    with open(text, "r", encoding="utf-8", buffering=1 << 20) as info:
+        for line in info:
+            line = line.split(maxsplit=3)
+            if line[0] == "start":
+                continue
+            phone = line[3].rstrip()
+            label_info.append("{} {} {}".format(float(line[0]), float(line[1]), phone))
+            text_info.append(phone)
     return " ".join(label_info), " ".join(text_info)
 
 
-def process_subset(src_data, subset, check_func):
-    subfolder = os.listdir(src_data)
-    makedir(subset)
-    wavscp = open(os.path.join(subset, "wav.scp"), "w", encoding="utf-8")
-    utt2spk = open(os.path.join(subset, "utt2spk"), "w", encoding="utf-8")
-    midiscp = open(os.path.join(subset, "midi.scp"), "w", encoding="utf-8")
-    text_scp = open(os.path.join(subset, "text"), "w", encoding="utf-8")
-    label_scp = open(os.path.join(subset, "label"), "w", encoding="utf-8")
+def write_lines(path, lines):
+    with open(path, "w", encoding="utf-8", buffering=1 << 20) as f:
+        f.write("".join(lines))
 
-    for csv in os.listdir(src_data, "csv"):
 
-        if not os.path.isfile(os.path.join(src_data, "csv", csv)):
-            continue
-        if not check_func(folder):
+def parse_song(csv_dir, wav_dir, mid_dir, song_name):
+    utt_id = f"{UTT_PREFIX}_{pack_zero(song_name)}"
+    wav_line = (
+        f"{utt_id} sox -t wavpcm {wav_dir}/{song_name}.wav -c 1 -t wavpcm -b 16 -|\n"
+    )
+    utt_line = f"{utt_id} {UTT_PREFIX}\n"
+    label_info, text_info = process_text_info(f"{csv_dir}/{song_name}.csv")
+    label_line = f"{utt_id} {label_info}\n"
+    text_line = f"{utt_id} {text_info}\n"
+    midi_line = f"{utt_id} {mid_dir}/{song_name}.mid\n"
+    return song_name, wav_line, utt_line, label_line, text_line, midi_line
+
+
+def process_subset(src_data, subset, song_ids, n_jobs=None, exclude=False):
+    makedir(subset)
+    csv_dir = os.path.join(src_data, "csv")
+    wav_dir = os.path.join(src_data, "wav")
+    mid_dir = os.path.join(src_data, "mid")
+
+    song_names = []
+    for csv in os.listdir(csv_dir):
+        if not os.path.isfile(os.path.join(csv_dir, csv)):
             continue
         song_name = csv[:-4]
-        utt_id = "{}_{}".format(UTT_PREFIX, pack_zero(song_name))
-        wavscp.write(
-            "{} sox -t wavpcm {} -c 1 -t wavpcm -b 16 -|\n".format(
-                utt_id, os.path.join(src_data, "wav", "{}.wav".format(song_name))
-            )
-        )
-        utt2spk.write("{} {}\n".format(utt_id, UTT_PREFIX))
-        label_info, text_info = process_text_info(
-            os.path.join(src_data, "csv", "{}.csv".format(song_name))
-        )
-        text_scp.write("{} {}\n".format(utt_id, text_info))
-        label_scp.write("{} {}\n".format(utt_id, label_info))
-        midiscp.write(
-            "{} {}\n".format(
-                utt_id, os.path.join(src_data, "mid", "{}.mid".format(song_name))
-            )
-        )
+        if (get_song_id(song_name) in song_ids) == exclude:
+            continue
+        song_names.append(song_name)
+
+    # NOTE: parsing is done in worker processes, files are written only here
+    with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+        parse_func = partial(parse_song, csv_dir, wav_dir, mid_dir)
+        results = list(executor.map(parse_func, song_names, chunksize=16))
+
+    _, wav_lines, utt_lines, label_lines, text_lines, midi_lines = (
+        zip(*results) if len(results) > 0 else ([],) * 6
+    )
+    write_lines(os.path.join(subset, "wav.scp"), wav_lines)
+    write_lines(os.path.join(subset, "utt2spk"), utt_lines)
+    write_lines(os.path.join(subset, "midi.scp"), midi_lines)
+    write_lines(os.path.join(subset, "text"), text_lines)
+    write_lines(os.path.join(subset, "label"), label_lines)
 
 
 if __name__ == "__main__":
@@ -95,8 +100,13 @@ if __name__ == "__main__":
     parser.add_argument("train", type=str, help="train set")
     parser.add_argument("dev", type=str, help="development set")
     parser.add_argument("test", type=str, help="test set")
+    parser.add_argument(
+        "--n_jobs", default=None, type=int, help="Number of parallel jobs."
+    )
     args = parser.parse_args()
 
-    process_subset(args.src_data, args.train, train_check)
-    process_subset(args.src_data, args.dev, dev_check)
-    process_subset(args.src_data, args.test, test_check)
+    process_subset(
+        args.src_data, args.train, DEV_SET | TEST_SET, args.n_jobs, exclude=True
+    )
+    process_subset(args.src_data, args.dev, DEV_SET, args.n_jobs)
+    process_subset(args.src_data, args.test, TEST_SET, args.n_jobs)
@@ -1,5 +1,6 @@
 import collections.abc
 import logging
+import os
 from pathlib import Path
 from typing import Union
 from miditoolkit import midi
@@ -23,6 +24,11 @@ class MIDIScpReader(collections.abc.Mapping):
         ...
         >>> reader = MIDIScpReader('midi.scp')
         >>> pitch_array, tempo_array = reader['key1']
+
+    If cache_dir is given, the sequences without time augmentation are saved
+    as "<cache_dir>/<rate>_<dtype>/<key>.npy" at the first access and
+    memory-mapped after that, instead of parsing the MIDI file every time.
+    The cache is made again if the MIDI file is newer than it.
     """
 
     def __init__(
@@ -31,6 +37,7 @@ class MIDIScpReader(collections.abc.Mapping):
         dtype=np.int16,
         loader_type: str = "representation",
         rate: np.int32 = np.int32(16000),
+        cache_dir: Union[Path, str] = None,
     ):
         assert check_argument_types()
         self.fname = fname
@@ -38,9 +45,47 @@ class MIDIScpReader(collections.abc.Mapping):
         self.rep = loader_type
         self.rate = rate
         self.data = read_2column_text(fname)  # get key-value dict
+        if cache_dir is not None:
+            # The sequences depend on the sampling rate and the dtype
+            cache_dir = Path(cache_dir) / f"{int(rate)}_{np.dtype(dtype).name}"
+            cache_dir.mkdir(parents=True, exist_ok=True)
+        self.cache_dir = cache_dir
+
+    def _load_cached(self, key):
+        path = self.cache_dir / f"{key}.npy"
+        try:
+            stale = os.stat(path).st_mtime_ns < os.stat(self.data[key]).st_mtime_ns
+        except FileNotFoundError:
+            stale = True
+        if not stale:
+            # seqs: (2, NSample)
+            seqs = np.load(path, mmap_mode="r")
+        else:
+            midi_obj = miditoolkit.midi.parser.MidiFile(self.data[key])
+            seqs = np.stack(midi_to_seq(midi_obj, self.dtype, self.rate))
+            # Write to a temporary file first not to expose a partial file
+            # to the other DataLoader workers
+            tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+            with tmp_path.open("wb") as f:
+                np.save(f, seqs)
+            os.replace(tmp_path, path)
+        return seqs[0], seqs[1]
 
     def __getitem__(self, key):
         key, pitch_aug_factor, time_aug_factor = key
+        if (
+            self.cache_dir is not None
+            and self.rep == "representation"
+            and time_aug_factor == 1
+        ):
+            note_seq, tempo_seq = self._load_cached(key)
+            if pitch_aug_factor != 0:
+                # Same as midi_to_seq(): shift the pitch except for rests
+                note_seq = np.where(
+                    note_seq != 0, note_seq + pitch_aug_factor, note_seq
+                ).astype(self.dtype, copy=False)
+            return note_seq, tempo_seq
+
         # return miditoolkit.midi.parser.MidiFile(self.data[key])
         midi_obj = miditoolkit.midi.parser.MidiFile(self.data[key])
 
@@ -72,6 +72,20 @@ class MuskitSVSModel(AbsMuskitModel):
         self.energy_normalize = energy_normalize
         self.svs = svs
 
+        # NOTE: syllable level score features are computed from frame level ones,
+        #   so build the frame level extractor once instead of at every step
+        if isinstance(score_feats_extract, SyllableScoreFeats):
+            self.frame_score_feats_extract = FrameScoreFeats(
+                fs=score_feats_extract.fs,
+                n_fft=score_feats_extract.n_fft,
+                win_length=score_feats_extract.win_length,
+                hop_length=score_feats_extract.hop_length,
+                window=score_feats_extract.window,
+                center=score_feats_extract.center,
+            )
+        else:
+            self.frame_score_feats_extract = None
+
     def forward(
         self,
         text: torch.Tensor,
@@ -183,14 +197,7 @@ class MuskitSVSModel(AbsMuskitModel):
                 text_lengths = torch.tensor(_text_length_cal).to(text.device)
 
             elif isinstance(self.score_feats_extract, SyllableScoreFeats):
-                extractMethod_frame = FrameScoreFeats(
-                    fs=self.score_feats_extract.fs,
-                    n_fft=self.score_feats_extract.n_fft,
-                    win_length=self.score_feats_extract.win_length,
-                    hop_length=self.score_feats_extract.hop_length,
-                    window=self.score_feats_extract.window,
-                    center=self.score_feats_extract.center,
-                )
+                extractMethod_frame = self.frame_score_feats_extract
 
                 # logging.info(f"extractMethod_frame: {extractMethod_frame}")
 
@@ -591,14 +598,7 @@ class MuskitSVSModel(AbsMuskitModel):
             text_lengths = torch.tensor(_text_length_cal).to(text.device)
 
         elif isinstance(self.score_feats_extract, SyllableScoreFeats):
-            extractMethod_frame = FrameScoreFeats(
-                fs=self.score_feats_extract.fs,
-                n_fft=self.score_feats_extract.n_fft,
-                win_length=self.score_feats_extract.win_length,
-                hop_length=self.score_feats_extract.hop_length,
-                window=self.score_feats_extract.window,
-                center=self.score_feats_extract.center,
-            )
+            extractMethod_frame = self.frame_score_feats_extract
 
             # logging.info(f"extractMethod_frame: {extractMethod_frame}")
 
@@ -25,7 +25,62 @@ from muskit.svs.abs_svs import AbsSVS
 import random
 from torch.distributions import Beta
 
-Beta_distribution = Beta(torch.tensor([0.5]), torch.tensor([0.5]))
+
+def _maybe_pack(xs, ilens):
+    """Pack padded sequences unless none of them is padded.
+
+    Args:
+        xs (Tensor): Batch of padded sequences (B, Tmax, D).
+        ilens (LongTensor): Batch of lengths on cpu (B,).
+    Returns:
+        Union[Tensor, PackedSequence]: xs itself if all lengths are Tmax,
+            otherwise the packed sequences.
+    """
+    if bool((ilens == xs.size(1)).all()):
+        return xs
+    return torch.nn.utils.rnn.pack_padded_sequence(
+        xs, ilens, batch_first=True, enforce_sorted=False
+    )
+
+
+def _maybe_pad(xs):
+    """Pad sequences packed by _maybe_pack.
+
+    Args:
+        xs (Union[Tensor, PackedSequence]): Output of the RNN.
+    Returns:
+        Tensor: Batch of padded sequences (B, Tmax, D).
+    """
+    if isinstance(xs, torch.nn.utils.rnn.PackedSequence):
+        xs, _ = torch.nn.utils.rnn.pad_packed_sequence(xs, batch_first=True)
+    return xs
+
+
+def _append_mixup(xs, index1, index2, weights=None):
+    """Append mixed-up pairs of samples to the batch.
+
+    The output is allocated once and both halves are written in place.
+
+    Args:
+        xs (Tensor): Batch of padded sequences (B, ...) or lengths (B,).
+        index1 (LongTensor): Indices of the first samples of the pairs (M,).
+        index2 (LongTensor): Indices of the second samples of the pairs (M,).
+        weights (Optional[Tensor]): Weights of the first samples (M, 1, 1).
+            If None, xs are lengths and the maximum of each pair is taken.
+    Returns:
+        Tensor: Batch with mixed-up samples (B + M, ...).
+    """
+    batch_size = xs.size(0)
+    ys = xs.new_empty((batch_size + index1.size(0),) + xs.shape[1:])
+    ys[:batch_size] = xs
+    if weights is None:
+        ys[batch_size:] = torch.max(xs[index1], xs[index2])
+    else:
+        # NOTE: x2 + w * (x1 - x2) == w * x1 + (1 - w) * x2 with one product.
+        #   torch.lerp() doesn't accept a tensor weight in torch 1.0.
+        x2 = xs[index2]
+        ys[batch_size:] = x2 + weights * (xs[index1] - x2)
+    return ys
 
 
 class NaiveRNNLoss(torch.nn.Module):
@@ -63,12 +118,21 @@ class NaiveRNNLoss(torch.nn.Module):
             Tensor: L1 loss value.
             Tensor: Mean square error loss value.
         """
-        # make mask and apply it
-        if self.use_masking:
+        # make mask once and share it between masking and weighted masking
+        if self.use_masking or self.use_weighted_masking:
             masks = make_non_pad_mask(olens).unsqueeze(-1).to(ys.device)
-            ys = ys.masked_select(masks)
-            after_outs = after_outs.masked_select(masks)
-            before_outs = before_outs.masked_select(masks)
+
+        # apply mask
+        if self.use_masking:
+            # NOTE: multiply by the mask instead of gathering each tensor with
+            #   masked_select, which gives the same mean over non-padded frames
+            float_masks = masks.to(ys.dtype)
+            denom = float_masks.sum() * ys.size(-1)
+            after_diff = (after_outs - ys) * float_masks
+            before_diff = (before_outs - ys) * float_masks
+            l1_loss = (after_diff.abs().sum() + before_diff.abs().sum()) / denom
+            mse_loss = (after_diff.pow(2).sum() + before_diff.pow(2).sum()) / denom
+            return l1_loss, mse_loss
 
         # calculate loss
         l1_loss = self.l1_criterion(after_outs, ys) + self.l1_criterion(before_outs, ys)
@@ -78,7 +142,6 @@ class NaiveRNNLoss(torch.nn.Module):
 
         # make weighted mask and apply it
         if self.use_weighted_masking:
-            masks = make_non_pad_mask(olens).unsqueeze(-1).to(ys.device)
             weights = masks.float() / masks.sum(dim=1, keepdim=True).float()
             out_weights = weights.div(ys.size(0) * ys.size(2))
 
@@ -154,6 +217,8 @@ class NaiveRNN(AbsSVS):
         # mixup - augmentation
         self.use_mixup_training = use_mixup_training
         self.loss_mixup_wight = loss_mixup_wight
+        # NOTE: created on the model device at the first mixup step
+        self.mixup_beta = None
 
         # use idx 0 as padding idx
         self.padding_idx = 0
@@ -341,109 +406,52 @@ class NaiveRNN(AbsSVS):
         label = label[:, : label_lengths.max()]  # for data-parallel
         batch_size = feats.size(0)
 
-        label_emb = self.encoder_input_layer(label)  # FIX ME: label Float to Int
-        midi_emb = self.midi_encoder_input_layer(midi)
-
-        if self.use_mixup_training and flag_IsValid == False:
-            # batch_size_mixup = batch_size // 2                  # !!! NOTE: origin - 2
-            # lst = [i for i in range(batch_size_mixup * 2)]
-            # random.shuffle(lst)
-
-            batch_size_mixup = 2
-            lst = random.sample(
-                [i for i in range(batch_size)], batch_size_mixup * 2
-            )  # mix-up per 2 samples
-
-            # mix-up augmentation
-            feats_mixup = torch.zeros(
-                (batch_size_mixup, feats.shape[1], feats.shape[2]),
-                dtype=feats.dtype,
-                layout=feats.layout,
-                device=feats.device,
-            )
-            feats_lengths_mixup = torch.zeros(
-                batch_size_mixup,
-                dtype=feats_lengths.dtype,
-                layout=feats_lengths.layout,
-                device=feats_lengths.device,
-            )
+        # NOTE: bind submodules once to skip repeated nn.Module.__getattr__ lookups
+        encoder_input_layer, midi_encoder_input_layer = (
+            self.encoder_input_layer,
+            self.midi_encoder_input_layer,
+        )
+        midi_projection, feat_out, postnet = (
+            self.midi_projection,
+            self.feat_out,
+            self.postnet,
+        )
 
-            midi_embed_mixup = torch.zeros(
-                (batch_size_mixup, midi_emb.shape[1], midi_emb.shape[2]),
-                dtype=midi_emb.dtype,
-                layout=midi_emb.layout,
-                device=midi_emb.device,
-            )
-            midi_lengths_mixup = torch.zeros(
-                batch_size_mixup,
-                dtype=midi_lengths.dtype,
-                layout=midi_lengths.layout,
-                device=midi_lengths.device,
-            )
+        label_emb = encoder_input_layer(label)  # FIX ME: label Float to Int
+        midi_emb = midi_encoder_input_layer(midi)
 
-            label_embed_mixup = torch.zeros(
-                (batch_size_mixup, label_emb.shape[1], label_emb.shape[2]),
-                dtype=label_emb.dtype,
-                layout=label_emb.layout,
-                device=label_emb.device,
-            )
-            label_lengths_mixup = torch.zeros(
-                batch_size_mixup,
-                dtype=label_lengths.dtype,
-                layout=label_lengths.layout,
-                device=label_lengths.device,
+        if self.use_mixup_training and flag_IsValid == False:
+            (
+                feats,
+                feats_lengths,
+                midi_emb,
+                midi_lengths,
+                label_emb,
+                label_lengths,
+            ) = self._apply_mixup(
+                feats, feats_lengths, midi_emb, midi_lengths, label_emb, label_lengths
             )
-
-            for i in range(batch_size_mixup):
-                index1 = lst[2 * i]
-                index2 = lst[2 * i + 1]
-
-                w1 = Beta_distribution.sample().to(
-                    feats.device
-                )  # !!! NOTE:  random.random()
-                w2 = 1 - w1
-
-                feats_mixup[i] = w1 * feats[index1] + w2 * feats[index2]
-                feats_lengths_mixup[i] = max(
-                    feats_lengths[index1], feats_lengths[index2]
-                )
-
-                midi_embed_mixup[i] = w1 * midi_emb[index1] + w2 * midi_emb[index2]
-                midi_lengths_mixup[i] = max(midi_lengths[index1], midi_lengths[index2])
-
-                label_embed_mixup[i] = w1 * label_emb[index1] + w2 * label_emb[index2]
-                label_lengths_mixup[i] = max(
-                    label_lengths[index1], label_lengths[index2]
-                )
-
-            feats = torch.cat((feats, feats_mixup), 0)
-            feats_lengths = torch.cat((feats_lengths, feats_lengths_mixup), 0)
-            midi_emb = torch.cat((midi_emb, midi_embed_mixup), 0)
-            midi_lengths = torch.cat((midi_lengths, midi_lengths_mixup), 0)
-            label_emb = torch.cat((label_emb, label_embed_mixup), 0)
-            label_lengths = torch.cat((label_lengths, label_lengths_mixup), 0)
             batch_size_origin = batch_size
             batch_size = feats.size(0)
 
-        label_emb = torch.nn.utils.rnn.pack_padded_sequence(
-            label_emb, label_lengths.to("cpu"), batch_first=True, enforce_sorted=False
-        )
-        midi_emb = torch.nn.utils.rnn.pack_padded_sequence(
-            midi_emb, midi_lengths.to("cpu"), batch_first=True, enforce_sorted=False
-        )
+        # NOTE: move both lengths to cpu with a single device sync
+        label_lengths_cpu, midi_lengths_cpu = torch.stack(
+            [label_lengths, midi_lengths]
+        ).cpu()
+        label_emb = _maybe_pack(label_emb, label_lengths_cpu)
+        midi_emb = _maybe_pack(midi_emb, midi_lengths_cpu)
 
-        hs_label, (_, _) = self.encoder(label_emb)
-        hs_midi, (_, _) = self.midi_encoder(midi_emb)
+        hs_label, hs_midi = self._run_encoders(label_emb, midi_emb)
 
-        hs_label, _ = torch.nn.utils.rnn.pad_packed_sequence(hs_label, batch_first=True)
-        hs_midi, _ = torch.nn.utils.rnn.pad_packed_sequence(hs_midi, batch_first=True)
+        hs_label = _maybe_pad(hs_label)
+        hs_midi = _maybe_pad(hs_midi)
 
         if self.midi_embed_integration_type == "add":
             hs = hs_label + hs_midi
-            hs = F.leaky_relu(self.midi_projection(hs))
+            hs = F.leaky_relu(midi_projection(hs))
         else:
             hs = torch.cat((hs_label, hs_midi), dim=-1)
-            hs = F.leaky_relu(self.midi_projection(hs))
+            hs = F.leaky_relu(midi_projection(hs))
         # integrate spk & lang embeddings
         if self.spks is not None:
             sid_embs = self.sid_emb(sids.view(-1))
@@ -467,48 +475,56 @@ class NaiveRNN(AbsSVS):
 
         # (B, T_feats//r, odim * r) -> (B, T_feats//r * r, odim)
         # before_outs = F.leaky_relu(self.feat_out(zs).view(zs.size(0), -1, self.odim))
-        before_outs = F.leaky_relu(self.feat_out(hs).view(hs.size(0), -1, self.odim))
+        # NOTE: activate in-place to avoid another (B, T_feats, odim) buffer
+        before_outs = F.leaky_relu(feat_out(hs), inplace=True).view(
+            hs.size(0), -1, self.odim
+        )
 
         # postnet -> (B, T_feats//r * r, odim)
-        if self.postnet is None:
+        if postnet is None:
             after_outs = before_outs
         else:
-            after_outs = before_outs + self.postnet(
-                before_outs.transpose(1, 2)
-            ).transpose(1, 2)
+            after_outs = before_outs + postnet(before_outs.transpose(1, 2)).transpose(
+                1, 2
+            )
+
+        # NOTE: with --use_amp the network above runs under autocast, but the
+        #   losses are always calculated in the dtype of the target features
+        before_outs = before_outs.to(feats.dtype)
+        after_outs = after_outs.to(feats.dtype)
 
         # modifiy mod part of groundtruth
         if self.reduction_factor > 1:
             assert feats_lengths.ge(
                 self.reduction_factor
             ).all(), "Output length must be greater than or equal to reduction factor."
-            olens = feats_lengths.new(
-                [olen - olen % self.reduction_factor for olen in feats_lengths]
-            )
-            max_olen = max(olens)
-            ys = feats[:, :max_olen]
+            olens = feats_lengths - feats_lengths % self.reduction_factor
         else:
-            ys = feats
             olens = feats_lengths
 
         # calculate loss values
         if self.use_mixup_training and flag_IsValid == False:
-            olens = feats_lengths[:batch_size_origin]
+            # NOTE: get both max lengths with a single device sync
+            max_olen_orig, max_olen_mix = torch.stack(
+                [
+                    feats_lengths[:batch_size_origin].max(),
+                    feats_lengths[batch_size_origin:batch_size].max(),
+                ]
+            ).tolist()
             l1_loss_origin, l2_loss_origin = self.criterion(
-                after_outs[:batch_size_origin, : olens.max()],
-                before_outs[:batch_size_origin, : olens.max()],
+                after_outs[:batch_size_origin, :max_olen_orig],
+                before_outs[:batch_size_origin, :max_olen_orig],
                 feats[:batch_size_origin],
                 feats_lengths[:batch_size_origin],
             )
-            olens = feats_lengths[batch_size_origin:batch_size]
             # logging.info(f"olens: {olens}, feats_lengths: {feats_lengths}")
             # logging.info(f"after_outs: {after_outs.shape}")
             # logging.info(f"feats: {feats.shape}")
             # logging.info(f"feats[batch_size_origin : batch_size]: {feats[batch_size_origin : batch_size].shape}")
             l1_loss_mixup, l2_loss_mixup = self.criterion(
-                after_outs[batch_size_origin:batch_size, : olens.max()],
-                before_outs[batch_size_origin:batch_size, : olens.max()],
-                feats[batch_size_origin:batch_size, : olens.max()],
+                after_outs[batch_size_origin:batch_size, :max_olen_mix],
+                before_outs[batch_size_origin:batch_size, :max_olen_mix],
+                feats[batch_size_origin:batch_size, :max_olen_mix],
                 feats_lengths[batch_size_origin:batch_size],
             )
             l1_loss = (
@@ -518,8 +534,10 @@ class NaiveRNN(AbsSVS):
                 1 - self.loss_mixup_wight
             ) * l2_loss_origin + self.loss_mixup_wight * l2_loss_mixup
         else:
+            max_olen = olens.max().item()
+            ys = feats[:, :max_olen]
             l1_loss, l2_loss = self.criterion(
-                after_outs[:, : olens.max()], before_outs[:, : olens.max()], ys, olens
+                after_outs[:, :max_olen], before_outs[:, :max_olen], ys, olens
             )
 
         if self.loss_type == "L1":
@@ -546,7 +564,7 @@ class NaiveRNN(AbsSVS):
             return loss, stats, weight
         else:
             # validation stage
-            return loss, stats, weight, after_outs[:, : olens.max()], ys, olens
+            return loss, stats, weight, after_outs[:, :max_olen], ys, olens
 
     def inference(
         self,
@@ -574,18 +592,28 @@ class NaiveRNN(AbsSVS):
             Dict[str, Tensor]: Output dict including the following items:
                 * feat_gen (Tensor): Output sequence of features (T_feats, odim).
         """
-        label_emb = self.encoder_input_layer(label)
-        midi_emb = self.midi_encoder_input_layer(midi)
+        # NOTE: bind submodules once to skip repeated nn.Module.__getattr__ lookups
+        encoder_input_layer, midi_encoder_input_layer = (
+            self.encoder_input_layer,
+            self.midi_encoder_input_layer,
+        )
+        midi_projection, feat_out, postnet = (
+            self.midi_projection,
+            self.feat_out,
+            self.postnet,
+        )
+
+        label_emb = encoder_input_layer(label)
+        midi_emb = midi_encoder_input_layer(midi)
 
-        hs_label, (_, _) = self.encoder(label_emb)
-        hs_midi, (_, _) = self.midi_encoder(midi_emb)
+        hs_label, hs_midi = self._run_encoders(label_emb, midi_emb)
 
         if self.midi_embed_integration_type == "add":
             hs = hs_label + hs_midi
-            hs = F.leaky_relu(self.midi_projection(hs))
+            hs = F.leaky_relu(midi_projection(hs))
         else:
             hs = torch.cat((hs_label, hs_midi), dim=-1)
-            hs = F.leaky_relu(self.midi_projection(hs))
+            hs = F.leaky_relu(midi_projection(hs))
         # integrate spk & lang embeddings
         if self.spks is not None:
             sid_embs = self.sid_emb(sids.view(-1))
@@ -599,18 +627,120 @@ class NaiveRNN(AbsSVS):
             hs = self._integrate_with_spk_embed(hs, spembs)
 
         # (B, T_feats//r, odim * r) -> (B, T_feats//r * r, odim)
-        before_outs = F.leaky_relu(self.feat_out(hs).view(hs.size(0), -1, self.odim))
+        # NOTE: activate in-place to avoid another (B, T_feats, odim) buffer
+        before_outs = F.leaky_relu(feat_out(hs), inplace=True).view(
+            hs.size(0), -1, self.odim
+        )
 
         # postnet -> (B, T_feats//r * r, odim)
-        if self.postnet is None:
+        if postnet is None:
             after_outs = before_outs
         else:
-            after_outs = before_outs + self.postnet(
-                before_outs.transpose(1, 2)
-            ).transpose(1, 2)
+            after_outs = before_outs + postnet(before_outs.transpose(1, 2)).transpose(
+                1, 2
+            )
 
         return after_outs, None, None  # outs, probs, att_ws
 
+    def _apply_mixup(
+        self,
+        feats: torch.Tensor,
+        feats_lengths: torch.Tensor,
+        midi_emb: torch.Tensor,
+        midi_lengths: torch.Tensor,
+        label_emb: torch.Tensor,
+        label_lengths: torch.Tensor,
+    ) -> Tuple[torch.Tensor, ...]:
+        """Append mix-up augmented samples to the batch.
+
+        Args:
+            feats (Tensor): Batch of padded target features (B, Lmax, odim).
+            feats_lengths (LongTensor): Batch of the lengths of each target (B,).
+            midi_emb (Tensor): Batch of midi embeddings (B, Tmax, eunits).
+            midi_lengths (LongTensor): Batch of the lengths of each midi (B,).
+            label_emb (Tensor): Batch of label embeddings (B, Tmax, eunits).
+            label_lengths (LongTensor): Batch of the lengths of each label (B,).
+        Returns:
+            Tuple[Tensor, ...]: Inputs with mix-up samples appended (B + M, ...).
+        """
+        # batch_size_mixup = batch_size // 2                  # !!! NOTE: origin - 2
+        # lst = [i for i in range(batch_size_mixup * 2)]
+        # random.shuffle(lst)
+
+        batch_size_mixup = 2
+
+        # NOTE: indices, weights and lengths need no gradient
+        with torch.no_grad():
+            lst = random.sample(
+                range(feats.size(0)), batch_size_mixup * 2
+            )  # mix-up per 2 samples
+            index1 = torch.tensor(lst[0::2], device=feats.device)
+            index2 = torch.tensor(lst[1::2], device=feats.device)
+            w1 = self._sample_mixup_weights(batch_size_mixup, feats.device).view(
+                -1, 1, 1
+            )  # !!! NOTE:  random.random()
+            feats_lengths = _append_mixup(feats_lengths, index1, index2)
+            midi_lengths = _append_mixup(midi_lengths, index1, index2)
+            label_lengths = _append_mixup(label_lengths, index1, index2)
+
+        # mix-up augmentation
+        feats = _append_mixup(feats, index1, index2, w1)
+        midi_emb = _append_mixup(midi_emb, index1, index2, w1)
+        label_emb = _append_mixup(label_emb, index1, index2, w1)
+
+        return feats, feats_lengths, midi_emb, midi_lengths, label_emb, label_lengths
+
+    def _sample_mixup_weights(self, n: int, device: torch.device) -> torch.Tensor:
+        """Sample mixup weights from Beta(0.5, 0.5) directly on the device.
+
+        Args:
+            n (int): Number of weights.
+            device (torch.device): Device of the weights.
+        Returns:
+            Tensor: Mixup weights (n, 1).
+        """
+        if self.mixup_beta is None or self.mixup_beta.concentration1.device != device:
+            concentration = torch.full((1,), 0.5, device=device)
+            self.mixup_beta = Beta(concentration, concentration)
+        return self.mixup_beta.sample((n,))
+
+    def _run_encoders(self, label_emb, midi_emb):
+        """Run label and midi encoders.
+
+        The two LSTMs are independent, so on GPU the midi encoder is launched
+        on a side stream to overlap with the label encoder.
+
+        Args:
+            label_emb (Union[Tensor, PackedSequence]): Label embeddings.
+            midi_emb (Union[Tensor, PackedSequence]): Midi embeddings.
+        Returns:
+            Union[Tensor, PackedSequence]: Label encoder outputs.
+            Union[Tensor, PackedSequence]: Midi encoder outputs.
+        """
+        encoder, midi_encoder = self.encoder, self.midi_encoder
+        encoder.flatten_parameters()
+        midi_encoder.flatten_parameters()
+        midi_data = (
+            midi_emb.data
+            if isinstance(midi_emb, torch.nn.utils.rnn.PackedSequence)
+            else midi_emb
+        )
+        if not midi_data.is_cuda:
+            hs_label, (_, _) = encoder(label_emb)
+            hs_midi, (_, _) = midi_encoder(midi_emb)
+            return hs_label, hs_midi
+
+        current_stream = torch.cuda.current_stream()
+        midi_stream = torch.cuda.Stream()
+        midi_stream.wait_stream(current_stream)
+        with torch.cuda.stream(midi_stream):
+            hs_midi, (_, _) = midi_encoder(midi_emb)
+        hs_label, (_, _) = encoder(label_emb)
+        current_stream.wait_stream(midi_stream)
+        # NOTE: inputs are allocated on the current stream
+        midi_data.record_stream(midi_stream)
+        return hs_label, hs_midi
+
     def _integrate_with_spk_embed(
         self, hs: torch.Tensor, spembs: torch.Tensor
     ) -> torch.Tensor:
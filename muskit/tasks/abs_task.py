@@ -825,6 +825,14 @@ class AbsTask(ABC):
             "as opened for ark files. "
             "This feature is only valid when data type is 'kaldi_ark'.",
         )
+        group.add_argument(
+            "--midi_cache_dir",
+            type=str_or_none,
+            default=None,
+            help="The directory to save the note and tempo sequences parsed from "
+            "MIDI files as npy files, which are memory-mapped in later epochs. "
+            "This feature is only valid when data type is 'midi'.",
+        )
         group.add_argument(
             "--valid_max_cache_size",
             type=humanfriendly_parse_size_or_none,
@@ -1480,6 +1488,7 @@ class AbsTask(ABC):
             preprocess=iter_options.preprocess_fn,
             max_cache_size=iter_options.max_cache_size,
             max_cache_fd=iter_options.max_cache_fd,
+            midi_cache_dir=args.midi_cache_dir,
             mode=mode,
             pitch_aug_min=args.pitch_aug_min,
             pitch_aug_max=args.pitch_aug_max,
@@ -1569,6 +1578,7 @@ class AbsTask(ABC):
             preprocess=iter_options.preprocess_fn,
             max_cache_size=iter_options.max_cache_size,
             max_cache_fd=iter_options.max_cache_fd,
+            midi_cache_dir=args.midi_cache_dir,
         )
         cls.check_task_requirements(
             dataset, args.allow_variable_data_keys, train=iter_options.train
@@ -17,6 +17,7 @@ from muskit.layers.global_mvn import GlobalMVN
 from muskit.tasks.abs_task import AbsTask
 from muskit.train.class_choices import ClassChoices
 from muskit.train.collate_fn import CommonCollateFn
+from muskit.train.collate_fn import SVSCollateFn
 from muskit.train.preprocessor import CommonPreprocessor
 from muskit.train.trainer import Trainer
 from muskit.svs.abs_svs import AbsSVS
@@ -107,6 +108,14 @@ svs_choices = ClassChoices(
     default="transformer",
 )
 
+# NOTE: the arguments are static, so one instance is shared by all data loaders
+_common_collate_fn = CommonCollateFn(
+    float_pad_value=0.0, int_pad_value=0, not_sequence=("spembs",)
+)
+_svs_collate_fn = SVSCollateFn(
+    float_pad_value=0.0, int_pad_value=0, not_sequence=("spembs",)
+)
+
 
 class SVSTask(AbsTask):
     num_optimizers: int = 1
@@ -235,9 +244,10 @@ class SVSTask(AbsTask):
         Tuple[List[str], Dict[str, torch.Tensor]],
     ]:
         assert check_argument_types()
-        return CommonCollateFn(
-            float_pad_value=0.0, int_pad_value=0, not_sequence=["spembs"]
-        )
+        if args.use_preprocessor:
+            return _svs_collate_fn
+        else:
+            return _common_collate_fn
 
     @classmethod
     def build_preprocess_fn(
@@ -286,19 +296,19 @@ class SVSTask(AbsTask):
     def build_model(cls, args: argparse.Namespace) -> MuskitSVSModel:
         assert check_argument_types()
         if isinstance(args.token_list, str):
-            with open(args.token_list, encoding="utf-8") as f:
-                token_list = [line.rstrip() for line in f]
+            with open(args.token_list, "rb") as f:
+                token_list = f.read().decode("utf-8").splitlines()
 
             # "args" is saved as it is in a yaml file by BaseTask.main().
             # Overwriting token_list to keep it as "portable".
-            args.token_list = token_list.copy()
+            args.token_list = token_list
         elif isinstance(args.token_list, (tuple, list)):
             token_list = args.token_list.copy()
         else:
             raise RuntimeError("token_list must be str or dict")
 
         vocab_size = len(token_list)
-        logging.info(f"Vocabulary size: {vocab_size }")
+        logging.info("Vocabulary size: %d", vocab_size)
 
         # 1. feats_extract
         if args.odim is None:
@@ -330,7 +340,7 @@ class SVSTask(AbsTask):
         energy_extract = None
         pitch_normalize = None
         energy_normalize = None
-        logging.info(f"args:{args}")
+        logging.info("args:%s", args)
         if getattr(args, "score_feats_extract", None) is not None:
             score_feats_extract_class = score_feats_extractor_choices.get_class(
                 args.score_feats_extract
@@ -375,6 +385,8 @@ class SVSTask(AbsTask):
             energy_normalize = energy_normalize_class(**args.energy_normalize_conf)
 
         # 5. Build model
+        # NOTE: text, durations and tempo are extracted together with the score
+        #   features, so all of them share the same score_feats_extract instance
         model = MuskitSVSModel(
             text_extract=score_feats_extract,
             feats_extract=feats_extract,
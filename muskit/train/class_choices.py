@@ -56,6 +56,9 @@ class ClassChoices:
         if default is None:
             self.optional = True
 
+        # Resolved classes keyed by the given name
+        self._class_cache = {}
+
     def choices(self) -> Tuple[Optional[str], ...]:
         retval = tuple(self.classes)
         if self.optional:
@@ -64,6 +67,9 @@ class ClassChoices:
             return retval
 
     def get_class(self, name: Optional[str]) -> Optional[type]:
+        if name in self._class_cache:
+            return self._class_cache[name]
+
         assert check_argument_types()
         if name is None or (self.optional and name.lower() == ("none", "null", "nil")):
             retval = None
@@ -71,6 +77,7 @@ class ClassChoices:
             class_obj = self.classes[name]
             assert check_return_type(class_obj)
             retval = class_obj
+            self._class_cache[name] = retval
         else:
             raise ValueError(
                 f"--{self.name} must be one of {self.choices()}: "
@@ -13,6 +13,40 @@ from typeguard import check_return_type
 
 from muskit.torch_utils.nets_utils import pad_list
 
+# The keys which are not zeroed by mask_aug in addition to not_sequence
+_NOT_MASKED = ("pitch_aug", "time_aug")
+
+
+def _apply_mask_aug(
+    output: Dict[str, torch.Tensor],
+    mask_range: torch.Tensor,
+    not_align: Collection[str],
+    not_sequence: Collection[str],
+):
+    """Zero the aligned tensors of the batch in the ranges given by mask_aug.
+
+    Args:
+        output: The padded tensors (Batch, Length, ...). Modified in place.
+        mask_range: (Batch, 2) [begin, end) of the masked frames of each sample
+    """
+    begin = mask_range[:, :1]
+    end = mask_range[:, 1:]
+    masks = {}
+    for key, tensor in output.items():
+        if (
+            key.endswith("_lengths")
+            or key in not_align
+            or key in not_sequence
+            or key in _NOT_MASKED
+        ):
+            continue
+        length = tensor.size(1)
+        if length not in masks:
+            # mask: (Batch, Length)
+            t = torch.arange(length)
+            masks[length] = (t >= begin) & (t < end)
+        tensor[masks[length]] = 0
+
 
 class CommonCollateFn:
     """Functor class of common_collate_fn()"""
@@ -22,11 +56,13 @@ class CommonCollateFn:
         float_pad_value: Union[float, int] = 0.0,
         int_pad_value: int = -32768,
         not_sequence: Collection[str] = (),
+        not_align: Collection[str] = ("text",),
     ):
         assert check_argument_types()
         self.float_pad_value = float_pad_value
         self.int_pad_value = int_pad_value
         self.not_sequence = set(not_sequence)
+        self.not_align = set(not_align)
 
     def __repr__(self):
         return (
@@ -42,14 +78,69 @@ class CommonCollateFn:
             float_pad_value=self.float_pad_value,
             int_pad_value=self.int_pad_value,
             not_sequence=self.not_sequence,
+            not_align=self.not_align,
         )
 
 
+class SVSCollateFn(CommonCollateFn):
+    """Collate function specialized for the SVS data loaders.
+
+    Each field is padded into one preallocated numpy buffer, which is then
+    converted to torch.Tensor without copying. The output is the same as
+    that of common_collate_fn(), including the masking by "mask_aug".
+    """
+
+    def __call__(
+        self, data: Collection[Tuple[str, Dict[str, np.ndarray]]]
+    ) -> Tuple[List[str], Dict[str, torch.Tensor]]:
+        uttids = [u for u, _ in data]
+        data = [d for _, d in data]
+        batch_size = len(data)
+
+        assert all(set(data[0]) == set(d) for d in data), "dict-keys mismatching"
+        assert all(
+            not k.endswith("_lengths") for k in data[0]
+        ), f"*_lengths is reserved: {list(data[0])}"
+
+        output = {}
+        for key in data[0]:
+            if key == "mask_aug":
+                continue
+            array_list = [d[key] for d in data]
+            first = array_list[0]
+            if first.dtype.kind == "i":
+                pad_value = self.int_pad_value
+            else:
+                pad_value = self.float_pad_value
+
+            # lens: (Batch,)
+            lens = np.fromiter(
+                (a.shape[0] for a in array_list), dtype=np.int64, count=batch_size
+            )
+            # array: (Batch, Length, ...)
+            array = np.full(
+                (batch_size, lens.max()) + first.shape[1:], pad_value, dtype=first.dtype
+            )
+            for i, a in enumerate(array_list):
+                array[i, : a.shape[0]] = a
+            output[key] = torch.from_numpy(array)
+
+            if key not in self.not_sequence:
+                output[key + "_lengths"] = torch.from_numpy(lens)
+
+        if "mask_aug" in data[0]:
+            mask_range = torch.from_numpy(np.stack([d["mask_aug"] for d in data]))
+            _apply_mask_aug(output, mask_range, self.not_align, self.not_sequence)
+
+        return uttids, output
+
+
 def common_collate_fn(
     data: Collection[Tuple[str, Dict[str, np.ndarray]]],
     float_pad_value: Union[float, int] = 0.0,
     int_pad_value: int = -32768,
     not_sequence: Collection[str] = (),
+    not_align: Collection[str] = ("text",),
 ) -> Tuple[List[str], Dict[str, torch.Tensor]]:
     """Concatenate ndarray-list to an array and convert to torch.Tensor.
 
@@ -65,7 +156,9 @@ def common_collate_fn(
         >>> model(**batch)
 
         Note that the dict-keys of batch are propagated from
-        that of the dataset as they are.
+        that of the dataset as they are, except for "mask_aug",
+        which zeroes the tensors other than not_align and not_sequence
+        in the given range of each sample.
 
     """
     assert check_argument_types()
@@ -79,6 +172,8 @@ def common_collate_fn(
 
     output = {}
     for key in data[0]:
+        if key == "mask_aug":
+            continue
         # NOTE(kamo):
         # Each models, which accepts these values finally, are responsible
         # to repaint the pad_value to the desired value for each tasks.
@@ -100,6 +195,10 @@ def common_collate_fn(
             lens = torch.tensor([d[key].shape[0] for d in data], dtype=torch.long)
             output[key + "_lengths"] = lens
 
+    if "mask_aug" in data[0]:
+        mask_range = torch.from_numpy(np.stack([d["mask_aug"] for d in data]))
+        _apply_mask_aug(output, mask_range, not_align, not_sequence)
+
     output = (uttids, output)
     # logging.info(f'output:{output}')
     # TODO allow the tuple type
@@ -1,23 +1,25 @@
 from abc import ABC
 from abc import abstractmethod
+import ast
 import collections
-import copy
+import concurrent.futures
 import functools
 import logging
 import numbers
+import os
 import random
 import re
+import sys
 from typing import Any
 from typing import Callable
 from typing import Collection
 from typing import Dict
 from typing import Mapping
+from typing import Optional
 from typing import Tuple
 from typing import Union
 
-import h5py
 import humanfriendly
-import kaldiio
 import numpy as np
 import torch
 from torch.utils.data.dataset import Dataset
@@ -32,8 +34,23 @@ from muskit.fileio.read_text import read_2column_text
 from muskit.fileio.read_text import read_label
 from muskit.fileio.sound_scp import SoundScpReader
 from muskit.fileio.midi_scp import MIDIScpReader
+from muskit.utils.sized_dict import SharedMemorySizedDict
 from muskit.utils.sized_dict import SizedDict
 
+# NOTE: typeguard inspects the call frame on every call,
+# so the per-sample type check is enabled only with MUSKIT_TYPECHECK=1
+_TYPECHECK_GETITEM = os.environ.get("MUSKIT_TYPECHECK", "0") == "1"
+
+
+@functools.lru_cache(maxsize=None)
+def _get_io_pool(pid: int) -> concurrent.futures.ThreadPoolExecutor:
+    """Return the thread pool to read the loaders of MuskitDataset.
+
+    The pool is created for each process because the threads of the pool
+    don't exist in the forked DataLoader workers.
+    """
+    return concurrent.futures.ThreadPoolExecutor(max_workers=4)
+
 
 class AdapterForSoundScpReader(collections.abc.Mapping):
     def __init__(self, loader, dtype=None):
@@ -98,7 +115,45 @@ class AdapterForSoundScpReader(collections.abc.Mapping):
 class H5FileWrapper:
     def __init__(self, path: str):
         self.path = path
-        self.h5_file = h5py.File(path, "r")
+        self._open()
+
+    def _open(self):
+        import h5py
+
+        self.h5_file = h5py.File(self.path, "r")
+        self._mmap = np.memmap(self.path, mode="r", dtype=np.uint8)
+        # Keep the mapped views of contiguous datasets instead of looking them up
+        # by name for every access. Chunked datasets are not kept open
+        # because libhdf5 allocates a chunk cache for each of them.
+        self._get_view = functools.lru_cache(maxsize=1024)(self._lookup_view)
+
+    def _lookup_view(self, key) -> Optional[np.ndarray]:
+        import h5py
+
+        value = self.h5_file[key]
+        if (
+            isinstance(value, h5py.Dataset)
+            # A dataset reached through an external link lives in another file,
+            # so the offset doesn't point into the mapped bytes of this one
+            and value.file.id == self.h5_file.id
+            and value.shape is not None
+            and value.shape != ()
+            and value.size > 0
+            and value.dtype.kind in "biuf"
+        ):
+            dcpl = value.id.get_create_plist()
+            if (
+                dcpl.get_layout() == h5py.h5d.CONTIGUOUS
+                and dcpl.get_external_count() == 0
+            ):
+                offset = value.id.get_offset()
+                if offset is not None:
+                    # A contiguous dataset is stored as is in the file,
+                    # so it can be read from the page cache without libhdf5
+                    return np.ndarray(
+                        value.shape, dtype=value.dtype, buffer=self._mmap, offset=offset
+                    )
+        return None
 
     def __repr__(self) -> str:
         return str(self.h5_file)
@@ -109,9 +164,33 @@ class H5FileWrapper:
     def __iter__(self):
         return iter(self.h5_file)
 
+    def __getstate__(self):
+        # h5py objects can't be pickled, so reopen the file on the other side
+        state = self.__dict__.copy()
+        del state["h5_file"]
+        del state["_mmap"]
+        del state["_get_view"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._open()
+
     def __getitem__(self, key) -> np.ndarray:
+        view = self._get_view(key)
+        if view is not None:
+            # NOTE: Copy from the mapped view not to return
+            # a read-only array backed by the file
+            return view.copy()
         value = self.h5_file[key]
-        return value[()]
+        if value.shape in (None, ()) or value.dtype.kind not in "biuf":
+            # Empty dataspace, scalars or non-numeric types e.g. strings.
+            # A scalar is returned as a numpy scalar as h5py does.
+            return value[()]
+        array = np.empty(value.shape, dtype=value.dtype)
+        if array.size > 0:
+            value.read_direct(array)
+        return array
 
 
 class AdapterForMIDIScpReader(collections.abc.Mapping):
@@ -163,12 +242,18 @@ class AdapterForLabelScpReader(collections.abc.Mapping):
 
         assert isinstance(retval, list)
         seq_len = len(retval)
-        sample_time = np.zeros((seq_len, 2))
-        sample_label = []
-        for i in range(seq_len):
-            sample_time[i, 0] = np.float32(retval[i][0])
-            sample_time[i, 1] = np.float32(retval[i][1])
-            sample_label.append(retval[i][2])
+        # NOTE: parse all start/end times in one pass instead of per element;
+        # values are rounded to float32 and returned as float64 as before
+        sample_time = (
+            np.fromiter(
+                (t for row in retval for t in row[:2]),
+                dtype=np.float32,
+                count=2 * seq_len,
+            )
+            .reshape(seq_len, 2)
+            .astype(np.float64)
+        )
+        sample_label = [row[2] for row in retval]
 
         assert isinstance(sample_time, np.ndarray) and isinstance(sample_label, list)
         return sample_time, sample_label
@@ -189,12 +274,12 @@ def sound_loader(path, float_dtype=None):
     return AdapterForSoundScpReader(loader, float_dtype)
 
 
-def midi_loader(path, float_dtype=None, rate=np.int32(24000)):
+def midi_loader(path, float_dtype=None, rate=np.int32(24000), cache_dir=None):
     # The file is as follows:
     #   utterance_id_A /some/where/a.mid
     #   utterance_id_B /some/where/b.midi
 
-    loader = MIDIScpReader(fname=path, rate=rate)
+    loader = MIDIScpReader(fname=path, rate=rate, cache_dir=cache_dir)
 
     # MIDIScpReader.__getitem__() returns ndarray
     return AdapterForMIDIScpReader(loader)
@@ -212,6 +297,8 @@ def label_loader(path, float_dtype=None):
 
 
 def kaldi_loader(path, float_dtype=None, max_cache_fd: int = 0):
+    import kaldiio
+
     loader = kaldiio.load_scp(path, max_cache_fd=max_cache_fd)
     return AdapterForSoundScpReader(loader, float_dtype)
 
@@ -238,7 +325,7 @@ DATA_TYPES = {
     # TODO(TaoQian)
     "midi": dict(
         func=midi_loader,
-        kwargs=["float_dtype"],
+        kwargs=["float_dtype", "midi_cache_dir"],
         help="MIDI format types which supported by sndfile mid, midi, etc."
         "\n\n"
         "   utterance_id_a a.mid\n"
@@ -355,6 +442,61 @@ DATA_TYPES = {
     ),
 }
 
+# The keyword arguments of the loader functions:
+#   the name in DATA_TYPES -> (the argument name, the getter from MuskitDataset)
+_LOADER_KWARGS = {
+    "loader_type": ("loader_type", lambda dataset, loader_type: loader_type),
+    "float_dtype": ("float_dtype", lambda dataset, loader_type: dataset.float_dtype),
+    "int_dtype": ("int_dtype", lambda dataset, loader_type: dataset.int_dtype),
+    "max_cache_fd": ("max_cache_fd", lambda dataset, loader_type: dataset.max_cache_fd),
+    "midi_cache_dir": (
+        "cache_dir",
+        lambda dataset, loader_type: dataset.midi_cache_dir,
+    ),
+}
+
+
+def _bind_loader(func: Callable, kwargs: Collection[str]) -> Callable:
+    """Resolve the keyword arguments of a DATA_TYPES entry once.
+
+    Returns a function of (path, loader_type, dataset) building the loader.
+    """
+    getters = []
+    for key in kwargs:
+        if key not in _LOADER_KWARGS:
+            raise RuntimeError(f"Not implemented keyword argument: {key}")
+        getters.append(_LOADER_KWARGS[key])
+
+    if hasattr(func, "__name__"):
+        name = func.__name__
+    else:
+        name = str(func)
+
+    def build_loader(path, loader_type, dataset):
+        try:
+            # logging.info(f"path: {path}")
+            return func(
+                path, **{k: getter(dataset, loader_type) for k, getter in getters}
+            )
+        except Exception:
+            logging.error(f"An error happend with {name}({path})")
+            raise
+
+    return build_loader
+
+
+_LOADER_BUILDERS = {
+    k: _bind_loader(v["func"], v["kwargs"]) for k, v in DATA_TYPES.items()
+}
+
+# NOTE: Most of the keys are plain names and can be looked up directly.
+# The others, e.g. "rand_int_\d+_\d+", fall back to re.match in the order of
+# DATA_TYPES with the patterns compiled once here.
+_LITERAL_LOADER_BUILDERS = {
+    k: v for k, v in _LOADER_BUILDERS.items() if re.escape(k) == k
+}
+_LOADER_BUILDER_PATTERNS = [(re.compile(k), v) for k, v in _LOADER_BUILDERS.items()]
+
 
 class AbsDataset(Dataset, ABC):
     @abstractmethod
@@ -391,6 +533,7 @@ class MuskitDataset(AbsDataset):
         int_dtype: str = "long",
         max_cache_size: Union[float, int, str] = 0.0,
         max_cache_fd: int = 0,
+        midi_cache_dir: str = None,
         not_align: list = ["text"],  # TODO(Tao): add to args
         mode: str = "valid",  # train, valid, plot_att, ...
         pitch_aug_min: int = 0,
@@ -407,12 +550,13 @@ class MuskitDataset(AbsDataset):
                 '1 or more elements are required for "path_name_type_list"'
             )
 
-        path_name_type_list = copy.deepcopy(path_name_type_list)
+        path_name_type_list = list(path_name_type_list)
         self.preprocess = preprocess
 
         self.float_dtype = float_dtype
         self.int_dtype = int_dtype
         self.max_cache_fd = max_cache_fd
+        self.midi_cache_dir = midi_cache_dir
 
         self.loader_dict = {}
         self.debug_info = {}
@@ -432,10 +576,15 @@ class MuskitDataset(AbsDataset):
             max_cache_size = humanfriendly.parse_size(max_cache_size)
         self.max_cache_size = max_cache_size
         if max_cache_size > 0:
-            self.cache = SizedDict(shared=True)
+            if sys.version_info >= (3, 8):
+                # Keep the cached arrays in shared memory
+                # instead of sending them through the Manager process
+                self.cache = SharedMemorySizedDict()
+            else:
+                self.cache = SizedDict(shared=True)
         else:
             self.cache = None
-        self.not_align = not_align
+        self.not_align = frozenset(not_align)
         self.mode = mode
 
         self.pitch_aug_min = pitch_aug_min
@@ -452,6 +601,35 @@ class MuskitDataset(AbsDataset):
             assert self.pitch_aug_min == 0
             assert self.pitch_aug_max == 0
 
+        # Parse the augmentation options once instead of every __getitem__
+        if self.pitch_mean == "None":
+            self._pitch_mean = None
+        else:
+            self._pitch_mean = ast.literal_eval(self.pitch_mean)
+            if not isinstance(self._pitch_mean, (float, int, list)):
+                raise ValueError(
+                    "Not Support Type for pitch_mean: %s" % self.pitch_mean
+                )
+        if isinstance(self._pitch_mean, list):
+            # multi datasets with spk-ids
+            # NOTE: Fix me into args
+            speaker_lst = ["oniku", "ofuton", "kiritan", "natsume"]
+            self._speaker_re = re.compile("|".join(map(re.escape, speaker_lst)))
+            self._speaker_index = {spk: i for i, spk in enumerate(speaker_lst)}
+        # The keys of the first loader to look up an integer id, built on first use
+        self._key_index = None
+        # The generator for the random augmentation, made on first use
+        self._rng = None
+        self._rng_pid = None
+        # The mean pitch of each utterance, filled on first access
+        self._pitch_mean_cache: Dict[str, float] = {}
+        self._time_list = tuple(
+            i / 100
+            for i in range(
+                int(self.time_aug_min * 100), int(self.time_aug_max * 100 + 1), 1
+            )
+        )
+
     def _build_loader(
         self, path: str, loader_type: str
     ) -> Mapping[str, Union[np.ndarray, torch.Tensor, str, numbers.Number]]:
@@ -461,36 +639,17 @@ class MuskitDataset(AbsDataset):
             path:  The file path
             loader_type:  loader_type. sound, npy, text_int, text_float, etc
         """
-        for key, dic in DATA_TYPES.items():
-            # e.g. loader_type="sound"
-            # -> return DATA_TYPES["sound"]["func"](path)
-            if re.match(key, loader_type):
-                kwargs = {}
-                for key2 in dic["kwargs"]:
-                    if key2 == "loader_type":
-                        kwargs["loader_type"] = loader_type
-                    elif key2 == "float_dtype":
-                        kwargs["float_dtype"] = self.float_dtype
-                    elif key2 == "int_dtype":
-                        kwargs["int_dtype"] = self.int_dtype
-                    elif key2 == "max_cache_fd":
-                        kwargs["max_cache_fd"] = self.max_cache_fd
-                    else:
-                        raise RuntimeError(f"Not implemented keyword argument: {key2}")
-
-                func = dic["func"]
-                try:
-                    # logging.info(f"path: {path}")
-                    return func(path, **kwargs)
-                except Exception:
-                    if hasattr(func, "__name__"):
-                        name = func.__name__
-                    else:
-                        name = str(func)
-                    logging.error(f"An error happend with {name}({path})")
-                    raise
-        else:
-            raise RuntimeError(f"Not supported: loader_type={loader_type}")
+        # e.g. loader_type="sound"
+        # -> return DATA_TYPES["sound"]["func"](path)
+        build_loader = _LITERAL_LOADER_BUILDERS.get(loader_type)
+        if build_loader is None:
+            for pattern, _build_loader in _LOADER_BUILDER_PATTERNS:
+                if pattern.match(loader_type):
+                    build_loader = _build_loader
+                    break
+            else:
+                raise RuntimeError(f"Not supported: loader_type={loader_type}")
+        return build_loader(path, loader_type, self)
 
     def has_name(self, name) -> bool:
         return name in self.loader_dict
@@ -509,144 +668,160 @@ class MuskitDataset(AbsDataset):
         _mes += f"\n  preprocess: {self.preprocess})"
         return _mes
 
+    def _get_rng(self) -> np.random.Generator:
+        """Return the random generator for the augmentation of this process.
+
+        The generator is made again in each DataLoader worker, seeded from
+        the random module, which pytorch seeds differently for each worker.
+        """
+        pid = os.getpid()
+        if self._rng_pid != pid:
+            self._rng = np.random.default_rng(random.getrandbits(64))
+            self._rng_pid = pid
+        return self._rng
+
+    def _load(self, name: str, uid: str, pitch_aug_factor: int) -> np.ndarray:
+        loader = self.loader_dict[name]
+        # name: text, singing, label, midi
+        try:
+            if name == "midi" or name == "singing":
+                global_time_aug_factor = 1
+                value = loader[(uid, pitch_aug_factor, global_time_aug_factor)]
+            else:
+                value = loader[uid]
+            if isinstance(value, list):
+                value = np.array(value)
+            if not isinstance(
+                value, (np.ndarray, torch.Tensor, str, numbers.Number, tuple)
+            ):
+                raise TypeError(
+                    f"Must be ndarray, torch.Tensor, str or Number: {type(value)}"
+                )
+        except Exception:
+            path, _type = self.debug_info[name]
+            logging.error(f"Error happened with path={path}, type={_type}, id={uid}")
+            raise
+
+        # torch.Tensor is converted to ndarray
+        if isinstance(value, torch.Tensor):
+            value = value.numpy()
+        elif isinstance(value, numbers.Number):
+            value = np.array([value])
+        return value
+
     def __getitem__(self, uid: Union[str, int]) -> Tuple[str, Dict[str, np.ndarray]]:
-        assert check_argument_types()
+        if _TYPECHECK_GETITEM:
+            assert check_argument_types()
 
         # Change integer-id to string-id
         if isinstance(uid, int):
-            d = next(iter(self.loader_dict.values()))
-            uid = list(d)[uid]
+            if self._key_index is None:
+                self._key_index = tuple(next(iter(self.loader_dict.values())))
+            uid = self._key_index[uid]
 
         if self.cache is not None and uid in self.cache:
             data = self.cache[uid]
             return uid, data
 
+        rng = self._get_rng()
         if self.mode == "train":
-            if self.pitch_mean != "None":
-                loader = self.loader_dict["midi"]
-                note_seq, tempo_seq = loader[(uid, 0, 1)]   # pitch_aug_factor = 0, global_time_aug_factor = 1
-
-                sample_pitch_mean = np.mean(note_seq)
-
-                if isinstance( eval(self.pitch_mean), float ):
+            if self._pitch_mean is not None:
+                sample_pitch_mean = self._pitch_mean_cache.get(uid)
+                if sample_pitch_mean is None:
+                    loader = self.loader_dict["midi"]
+                    # pitch_aug_factor = 0, global_time_aug_factor = 1
+                    note_seq, tempo_seq = loader[(uid, 0, 1)]
+                    sample_pitch_mean = float(np.mean(note_seq))
+                    self._pitch_mean_cache[uid] = sample_pitch_mean
+
+                if isinstance(self._pitch_mean, (float, int)):
                     # single dataset w/o spk-id
-                    global_pitch_mean = float(self.pitch_mean)
-                elif isinstance( eval(self.pitch_mean), list ):
-                    # multi datasets with spk-ids
-                    speaker_lst = ["oniku", "ofuton", "kiritan", "natsume"]     # NOTE: Fix me into args
-                    _find_num = 0
-                    _find_index = 0
-                    for index in range(len(speaker_lst)):
-                        if speaker_lst[index] in uid:
-                            _find_num += 1
-                            _find_index = index
-                    assert _find_num == 1
-                    global_pitch_mean = eval(self.pitch_mean)[_find_index]
+                    global_pitch_mean = float(self._pitch_mean)
                 else:
-                    ValueError("Not Support Type for pitch_mean: %s" % self.pitch_mean)
+                    # multi datasets with spk-ids
+                    _found = set(self._speaker_re.findall(uid))
+                    assert len(_found) == 1
+                    _find_index = self._speaker_index[_found.pop()]
+                    global_pitch_mean = self._pitch_mean[_find_index]
 
                 gap = int((global_pitch_mean - sample_pitch_mean))
-                if gap == 0:
-                    lst = [0]
-                elif gap < 0:
-                    lst = [i for i in range(gap, 1)]
-                else:
-                    lst = [i for i in range(0, gap+1)]
-                # logging.info(f"type: {type(note_seq)}, mean: {np.mean(note_seq)}, lst: {lst}, gap: {gap}")
-                pitch_aug_factor = random.sample(lst, 1)[0]
+                # Uniform from [gap, 0] or [0, gap]
+                pitch_aug_factor = int(rng.integers(min(gap, 0), max(gap, 0) + 1))
             else:
-                pitch_aug_factor = random.randint(self.pitch_aug_min, self.pitch_aug_max)
-
-            _time_list = [
-                i / 100
-                for i in range(
-                    int(self.time_aug_min * 100), int(self.time_aug_max * 100 + 1), 1
+                pitch_aug_factor = int(
+                    rng.integers(self.pitch_aug_min, self.pitch_aug_max + 1)
                 )
-            ]
+
             # _time_list = [1, 1.06, 1.12, 1.18, 1.24]
             # for _ in range(8):
             #     _time_list.append(1.0)
-            time_aug_factor = random.sample(_time_list, 1)[0]
+            time_aug_factor = self._time_list[rng.integers(len(self._time_list))]
         else:
             pitch_aug_factor = 0
             time_aug_factor = 1
 
-        data = {}
         # 1. Load data from each loaders
-        for name, loader in self.loader_dict.items():
-            # name: text, singing, label, midi
-            try:
-                if name == "midi" or name == "singing":
-                    global_time_aug_factor = 1
-                    value = loader[(uid, pitch_aug_factor, global_time_aug_factor)]
-                else:
-                    value = loader[uid]
-                if isinstance(value, list):
-                    value = np.array(value)
-                if not isinstance(
-                    value, (np.ndarray, torch.Tensor, str, numbers.Number, tuple)
-                ):
-                    raise TypeError(
-                        f"Must be ndarray, torch.Tensor, str or Number: {type(value)}"
-                    )
-            except Exception:
-                path, _type = self.debug_info[name]
-                logging.error(
-                    f"Error happened with path={path}, type={_type}, id={uid}"
-                )
-                raise
-
-            # torch.Tensor is converted to ndarray
-            if isinstance(value, torch.Tensor):
-                value = value.numpy()
-            elif isinstance(value, numbers.Number):
-                value = np.array([value])
-            data[name] = value
+        if len(self.loader_dict) > 1:
+            # NOTE: The reads of the loaders are mostly IO bound,
+            # so they are issued at once from a thread pool
+            pool = _get_io_pool(os.getpid())
+            futures = [
+                pool.submit(self._load, name, uid, pitch_aug_factor)
+                for name in self.loader_dict
+            ]
+            data = {name: f.result() for name, f in zip(self.loader_dict, futures)}
+        else:
+            data = {
+                name: self._load(name, uid, pitch_aug_factor)
+                for name in self.loader_dict
+            }
 
         # 2. [Option] Apply preprocessing
         #   e.g. muskit.train.preprocessor:CommonPreprocessor
         if self.preprocess is not None:
             data = self.preprocess(uid, data, time_aug_factor)
 
-        length = min(
-            [len(data[key]) for key in data.keys() if key not in self.not_align]
-        )
+        align_names = {key for key in data if key not in self.not_align}
+        length = min(len(data[key]) for key in align_names)
         # logging.info(f"length: {length}")
 
         if self.mode == "train" and self.mask_aug:
             # mask_length = 4500      # 1500 = 300 * 5
-            mask_length = random.randint(0, int(length * 0.2))
+            mask_length = int(rng.integers(0, int(length * 0.2) + 1))
             if length - mask_length > 0:
-                mask_index_begin = random.randint(0, int(length - mask_length))
+                mask_index_begin = int(rng.integers(0, int(length - mask_length) + 1))
                 mask_index_end = mask_index_begin + mask_length
             else:
                 mask_index_begin = 0
                 mask_index_end = length
 
         if self.mode == "train" and self.random_crop:
-            crop_length = random.randint(int(length * 0.8), length)
-            crop_index_begin = random.randint(0, int(length - crop_length))
+            crop_length = int(rng.integers(int(length * 0.8), length + 1))
+            crop_index_begin = int(rng.integers(0, int(length - crop_length) + 1))
             crop_index_end = crop_index_begin + crop_length
-
-        for key, value in data.items():
-            if key in self.not_align:
-                continue
-            # logging.info(f"key: {key}, data[key].shape: {data[key].shape}")
-            data[key] = data[key][:length]
-            if self.mode == "train" and self.mask_aug:
-                data[key][mask_index_begin:mask_index_end] = 0
-            if self.mode == "train" and self.random_crop:
-                data[key] = data[key][crop_index_begin:crop_index_end]
+        else:
+            crop_index_begin = 0
+            crop_index_end = length
 
         # phone-level time augmentation
 
         # quit()
         data["pitch_aug"] = np.array([pitch_aug_factor])
         data["time_aug"] = np.array([time_aug_factor])
+        if self.mode == "train" and self.mask_aug:
+            # The mask range relative to the cropped region. The aligned data
+            # are zeroed in this range for the whole batch by the collate_fn,
+            # so it must not reach the padding after the cropped region.
+            data["mask_aug"] = np.array(
+                [
+                    max(mask_index_begin - crop_index_begin, 0),
+                    max(min(mask_index_end, crop_index_end) - crop_index_begin, 0),
+                ]
+            )
 
-        # 3. Force data-precision
-        for name in data:
-            value = data[name]
+        # 3. Cut out the aligned region and force data-precision
+        for name, value in data.items():
+            align = name in align_names
             if not isinstance(value, (np.ndarray, tuple)):
                 raise RuntimeError(
                     f"All values must be converted to np.ndarray object "
@@ -655,11 +830,17 @@ class MuskitDataset(AbsDataset):
             if isinstance(value, np.ndarray):
                 # Cast to desired type
                 if value.dtype.kind == "f":
-                    value = value.astype(self.float_dtype)
+                    dtype = self.float_dtype
                 elif value.dtype.kind == "i":
-                    value = value.astype(self.int_dtype)
+                    dtype = self.int_dtype
                 else:
                     raise NotImplementedError(f"Not supported dtype: {value.dtype}")
+                if align:
+                    # logging.info(f"key: {name}, value.shape: {value.shape}")
+                    value = value[crop_index_begin:crop_index_end]
+                value = value.astype(dtype, copy=False)
+            elif align:
+                value = value[crop_index_begin:crop_index_end]
             data[name] = value
 
         if self.cache is not None and self.cache.size < self.max_cache_size:
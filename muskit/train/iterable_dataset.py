@@ -11,7 +11,6 @@ from typing import Iterator
 from typing import Tuple
 from typing import Union
 
-import kaldiio
 import numpy as np
 import soundfile
 import torch
@@ -26,6 +25,8 @@ else:
 
 
 def load_kaldi(input):
+    import kaldiio
+
     retval = kaldiio.load_mat(input)
     if isinstance(retval, tuple):
         assert len(retval) == 2, len(retval)
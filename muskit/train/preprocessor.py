@@ -19,6 +19,11 @@ from muskit.text.build_tokenizer import build_tokenizer
 from muskit.text.cleaner import TextCleaner
 from muskit.text.token_id_converter import TokenIDConverter
 
+try:
+    import numba
+except ImportError:
+    numba = None
+
 
 class AbsPreprocessor(ABC):
     def __init__(self, train: bool):
@@ -131,6 +136,26 @@ def detect_non_silence(
     )
 
 
+def fill_label(
+    labelseq: np.ndarray, starts: np.ndarray, ends: np.ndarray, values: np.ndarray
+):
+    """Fill the frames of each phone with its label id in place.
+
+    Args:
+        labelseq: (Time,)
+        starts: Start frame of each phone (Phone,)
+        ends: End frame of each phone (Phone,)
+        values: Label id of each phone (Phone,)
+
+    """
+    for i in range(starts.shape[0]):
+        labelseq[starts[i] : ends[i]] = values[i]
+
+
+if numba is not None:
+    fill_label = numba.njit(cache=True)(fill_label)
+
+
 class CommonPreprocessor(AbsPreprocessor):
     def __init__(
         self,
@@ -184,6 +209,13 @@ class CommonPreprocessor(AbsPreprocessor):
                 token_list=token_list,
                 unk_symbol=unk_symbol,
             )
+            # NOTE: compile fill_label here rather than in the first batch
+            fill_label(
+                np.zeros(1),
+                np.zeros(1, dtype=np.int64),
+                np.ones(1, dtype=np.int64),
+                np.zeros(1),
+            )
         else:
             self.text_cleaner = None
             self.tokenizer = None
@@ -258,18 +290,21 @@ class CommonPreprocessor(AbsPreprocessor):
             # so the global_time_aug_factor won`t be applied here when init.
             labelseq = np.zeros((nsamples))
             offset = timeseq[0, 0]
+            starts = ((timeseq[:, 0] - offset) * self.fs).astype(np.int64)
+            ends = ((timeseq[:, 1] - offset) * self.fs).astype(np.int64) + 1
+            ends[ends > nsamples] = nsamples - 1
+            fill_label(
+                labelseq, starts, ends, np.asarray(text_ints, dtype=labelseq.dtype)
+            )
+
             anchor_pairs = []
-            for i in range(timeseq.shape[0]):
-                start = int((timeseq[i, 0] - offset) * self.fs)
-                end = int((timeseq[i, 1] - offset) * self.fs) + 1
-                if end > nsamples:
-                    end = nsamples - 1
-                labelseq[start:end] = text_ints[i]
-
-                # phone-level augmentation for vowels
-                if text_ints[i] in vowel_ints and phone_time_aug_factor != 1.0:
-                    if random.random() < 0.5:
-                        anchor_pairs.append((start, end, text_ints[i]))
+            if phone_time_aug_factor != 1.0:
+                for i in range(timeseq.shape[0]):
+                    # phone-level augmentation for vowels
+                    if text_ints[i] in vowel_ints and random.random() < 0.5:
+                        anchor_pairs.append(
+                            (int(starts[i]), int(ends[i]), text_ints[i])
+                        )
             # logging.info(f"anchor_pairs: {anchor_pairs}， uid: {uid}, phone_time_aug_factor: {phone_time_aug_factor}")
 
             # phone-level augmentation
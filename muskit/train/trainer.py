@@ -493,7 +493,9 @@ class Trainer:
                 if iterator_stop > 0:
                     break
 
-            batch = to_device(batch, "cuda" if ngpu > 0 else "cpu")
+            # NOTE: The batches are in pinned memory when ngpu > 0,
+            # so the host to device copy can overlap with the computation
+            batch = to_device(batch, "cuda" if ngpu > 0 else "cpu", non_blocking=True)
             if no_forward_run:
                 all_steps_are_invalid = False
                 continue
@@ -737,7 +739,7 @@ class Trainer:
                 if iterator_stop > 0:
                     break
 
-            batch = to_device(batch, "cuda" if ngpu > 0 else "cpu")
+            batch = to_device(batch, "cuda" if ngpu > 0 else "cpu", non_blocking=True)
             if no_forward_run:
                 continue
 
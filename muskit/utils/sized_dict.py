@@ -1,8 +1,24 @@
+import atexit
 import collections
 import sys
 
+import numpy as np
 from torch import multiprocessing
 
+try:
+    from multiprocessing import resource_tracker
+    from multiprocessing import shared_memory
+except ImportError:
+    # Python<3.8
+    resource_tracker = None
+    shared_memory = None
+
+
+class SharedArray(collections.namedtuple("SharedArray", "name shape dtype nbytes")):
+    """The location of an ndarray stored in a shared memory block."""
+
+    __slots__ = ()
+
 
 def get_size(obj, seen=None):
     """Recursively finds size of objects
@@ -23,7 +39,9 @@ def get_size(obj, seen=None):
     # self-referential objects
     seen.add(obj_id)
 
-    if isinstance(obj, dict):
+    if isinstance(obj, SharedArray):
+        size += obj.nbytes
+    elif isinstance(obj, dict):
         size += sum([get_size(v, seen) for v in obj.values()])
         size += sum([get_size(k, seen) for k in obj.keys()])
     elif hasattr(obj, "__dict__"):
@@ -73,3 +91,99 @@ class SizedDict(collections.abc.MutableMapping):
 
     def __len__(self):
         return len(self.cache)
+
+
+class SharedMemorySizedDict(SizedDict):
+    """SizedDict shared between processes keeping ndarrays in shared memory.
+
+    Only the names of the shared memory blocks go through the Manager,
+    so an ndarray is not pickled and sent to the manager process and back
+    for each access. The values are copied out of the shared memory
+    when they are read.
+
+    """
+
+    def __init__(self, data: dict = None):
+        """Initialize SharedMemorySizedDict.
+
+        Args:
+            data: The initial items of the dict.
+
+        """
+        if shared_memory is None:
+            raise RuntimeError("SharedMemorySizedDict requires Python>=3.8")
+        super().__init__(shared=True, data=data)
+        # NOTE: Start the resource tracker in the parent process
+        # so that the forked DataLoader workers share it. Otherwise,
+        # the blocks created in a worker are unlinked when the worker exits.
+        resource_tracker.ensure_running()
+        atexit.register(self._unlink_all)
+
+    def __setitem__(self, key, value):
+        if key in self.cache:
+            del self[key]
+        # NOTE: get_size() counts the bytes of SharedArray
+        super().__setitem__(key, _to_shared(value))
+
+    def __getitem__(self, key):
+        return _from_shared(self.cache[key])
+
+    def __delitem__(self, key):
+        value = self.cache[key]
+        super().__delitem__(key)
+        _unlink_shared(value)
+
+    def _unlink_all(self):
+        try:
+            values = self.cache.values()
+        except Exception:
+            # The manager process has already exited
+            return
+        for value in values:
+            _unlink_shared(value)
+
+
+def _to_shared(value):
+    if isinstance(value, dict):
+        return {k: _to_shared(v) for k, v in value.items()}
+    elif isinstance(value, tuple) and not isinstance(value, SharedArray):
+        return tuple(_to_shared(v) for v in value)
+    elif isinstance(value, np.ndarray) and value.dtype.kind in "biufc" and value.nbytes:
+        shm = shared_memory.SharedMemory(create=True, size=value.nbytes)
+        np.ndarray(value.shape, dtype=value.dtype, buffer=shm.buf)[...] = value
+        retval = SharedArray(shm.name, value.shape, value.dtype.str, value.nbytes)
+        shm.close()
+        return retval
+    else:
+        return value
+
+
+def _from_shared(value):
+    if isinstance(value, SharedArray):
+        shm = shared_memory.SharedMemory(name=value.name)
+        try:
+            return np.ndarray(value.shape, dtype=value.dtype, buffer=shm.buf).copy()
+        finally:
+            shm.close()
+    elif isinstance(value, dict):
+        return {k: _from_shared(v) for k, v in value.items()}
+    elif isinstance(value, tuple):
+        return tuple(_from_shared(v) for v in value)
+    else:
+        return value
+
+
+def _unlink_shared(value):
+    if isinstance(value, SharedArray):
+        try:
+            shm = shared_memory.SharedMemory(name=value.name)
+        except FileNotFoundError:
+            return
+        shm.close()
+        shm.unlink()
+    elif isinstance(value, dict):
+        for v in value.values():
+            _unlink_shared(v)
+    elif isinstance(value, tuple):
+        for v in value:
+            _unlink_shared(v)